@@ -20,13 +20,17 @@
 #   「代理/工具說它錯」不等於「它錯」—— 這個 repo 已經被這件事咬過很多次。
 
 import io
-import json
 import re
 import sys
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
 from difflib import SequenceMatcher
+from functools import lru_cache
+from itertools import chain
 
 sys.path.insert(0, 'tools')
 from fetch_text import fetch, norm  # noqa: E402
+from json_io import dump_json, load_json  # noqa: E402
 
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
@@ -41,6 +45,9 @@ MARK = re.compile(r'[(（]([A-D])[)）]|(?<![A-Za-z])([A-D])[.．]\s')
 TODAY = '2026-07-14'
 
 
+# sim() 對每一題都要做「來源選項 × 題庫選項」兩兩比對，同一段選項文字會被正規化好幾輪
+# （挑區塊的 fit() 一次、建對應表又一次）。文字不變，結果就不變 —— 記住它。
+@lru_cache(maxsize=4096)
 def key(s):
     return norm(s or '').translate(FOLD)
 
@@ -57,6 +64,18 @@ def _cut(page, i):
     return page[st:en]
 
 
+@lru_cache(maxsize=16)
+def _flatten(page):
+    """(壓平後的全文, 壓平後的位置 → 原文位置)。
+
+    一份答案卡 PDF 會被幾十題反覆查 —— 原本 blocks_of() 每查一題就把整份全文
+    重新壓平、再逐字建一次位置對照表。頁面不變，這兩樣就不變：每份 PDF 只建一次。
+    """
+    flat = re.sub(r'\s+', '', page)
+    back = [pos for pos, ch in enumerate(page) if not ch.isspace()]
+    return flat, back
+
+
 def blocks_of(page, stem, quote):
     """切出這一題**所有可能**的區塊（題幹在 PDF 裡可能出現不只一次）。
 
@@ -70,9 +89,7 @@ def blocks_of(page, stem, quote):
 
     find() 回 -1 時絕對不可以繼續切片 —— 那會靜靜切出檔案開頭。
     """
-    flat = re.sub(r'\s+', '', page)
-    # 壓平後的位置 → 原文位置
-    back = [pos for pos, ch in enumerate(page) if not ch.isspace()]
+    flat, back = _flatten(page)
     out = []
     for probe in (stem, quote):
         anchor = re.sub(r'\s+', '', probe or '')[:14]
@@ -91,7 +108,7 @@ def blocks_of(page, stem, quote):
 
 
 def parse_opts(block):
-    """區塊裡**來源自己的**選項。回傳 (選項字典, 行首答案字母, 去掉行首後的內文)。
+    """區塊裡**來源自己的**選項。回傳 (選項字典, 行首答案字母, 去掉行首後的內文, 標記, 各字母首個標記, 標記位置)。
 
     行首的「(D) 18.」是**答案卡**，不是選項 D —— 先剝掉它再找選項。
     每個選項的文字切到**下一個標記**為止，不是切到「下一個第一次出現的字母」——
@@ -108,11 +125,13 @@ def parse_opts(block):
         if k not in seen:
             seen.add(k)
             firsts.append((pos, k))
+    # marks 是 finditer 的結果，位置本來就嚴格遞增 —— 「下一個標記」用二分搜尋找，不必從頭掃
+    poss = [p for p, _ in marks]
     src = {}
     for pos, k in firsts:
-        nxt = next((p for p, _ in marks if p > pos), len(block))
-        src[k] = _trim(block[pos + 3:nxt])
-    return src, lead, block, marks, firsts
+        i = bisect_right(poss, pos)
+        src[k] = _trim(block[pos + 3:poss[i] if i < len(poss) else len(block)])
+    return src, lead, block, marks, firsts, poss
 
 
 # 選項 D 是最後一個，它的文字會一路吃到區塊結尾 ——
@@ -128,7 +147,7 @@ def _trim(t):
 
 def key_letter(block):
     """(來源選項字典, 答案卡上的**字母**, 格式) —— 解析不出來就回 (src, None, 原因)。"""
-    src, lead, body, marks, firsts = parse_opts(block)
+    src, lead, body, marks, firsts, poss = parse_opts(block)
     if not marks:
         return src, None, '區塊裡找不到選項標記'
     if len(src) < 3:
@@ -144,9 +163,9 @@ def key_letter(block):
     # 格式 C：雙欄 —— 選項列完之後，右欄**重印一次答案**（開頭就是 (X)）
     pD = dict((k, p) for p, k in firsts).get('D')
     if pD is not None:
-        after = [(p, k) for p, k in marks if p > pD]
-        if after and after[0][1] in src:
-            return src, after[0][1], 'C:雙欄答案卡'
+        i = bisect_right(poss, pD)   # 沿用 parse_opts 已排好的標記位置，不再重建一份
+        if i < len(marks) and marks[i][1] in src:
+            return src, marks[i][1], 'C:雙欄答案卡'
     return src, None, '認不出答案卡格式'
 
 
@@ -163,18 +182,19 @@ def load_overrides():
 
     **兩個互不知道的系統，一定會漂。** 這支工具必須讀那份 manifest。
     """
+    # 整份載入再取 entries。**不要**改成 ijson 串流：它停不在 entries，照樣把 dispositions 解析完，
+    # 量過 171 KB 的 manifest 是 ~1.1 ms 對 load_json 的 ~0.3 ms —— 省下的記憶體在這個大小微不足道。
     try:
-        m = json.load(open('quiz-app/src/data/restoration-manifest.json', encoding='utf-8'))
+        return {e['item_id']: e['answer_override']
+                for e in load_json('quiz-app/src/data/restoration-manifest.json').get('entries', [])
+                if e.get('answer_override')}
     except OSError:
         return {}
-    return {e['item_id']: e['answer_override']
-            for e in m.get('entries', []) if e.get('answer_override')}
 
 
 def main():
-    ds = json.load(open('quiz-app/src/data/integrated_dataset.json', encoding='utf-8'))
-    pool = json.load(open('quiz-app/src/data/practice_pool.json', encoding='utf-8'))
-    ALL = ds['gist_items'] + ds['our_unique_items'] + pool['items']
+    ds = load_json('quiz-app/src/data/integrated_dataset.json')
+    pool = load_json('quiz-app/src/data/practice_pool.json')
     OVERRIDE = load_overrides()
 
     def qid(q):
@@ -195,35 +215,47 @@ def main():
     #   而當時只驗了 121 題 —— **另外約 119 題一直都驗得了，只是沒人去對。**
     #
     #   → 現在直接**拿題幹去 6 份答案卡 PDF 裡搜**。引用只是提示，不是門票。
-    KEY_PAGES = {}
-    for k in KEYED:
+    def fetch_key(k):
         for base in ('https://usr.chu.edu.tw/var/file/81/1081/img/1034/',
                      'https://usr.chu.edu.tw/var/file/81/1081/img/'):
             t = fetch(base + k + '.pdf')[0]
             if t:
-                KEY_PAGES[base + k + '.pdf'] = t
-                break
+                return base + k + '.pdf', t
+        return None
+
+    # 6 份 PDF 互不相干，一份抓不到還要再等 Wayback —— 依序抓就是把 6 次網路等待疊起來。
+    # **順序不能亂**：find_pdf() 依 KEY_PAGES 的順序找、回傳第一個命中的，
+    # 所以用 map（結果照 KEYED 的順序回來），不用 as_completed。
+    with ThreadPoolExecutor(max_workers=len(KEYED)) as ex:
+        KEY_PAGES = dict(hit for hit in ex.map(fetch_key, KEYED) if hit)
+
+    # 壓平後的 PDF 全文，**一份 PDF 只壓一次**。原本 find_pdf() 每查一題，
+    # 就把 6 份幾十萬字的全文各跑一次 re.sub —— 九百多題 × 6 份，全是同樣的結果。
+    FLAT = {u: _flatten(t)[0] for u, t in KEY_PAGES.items()}
 
     def find_pdf(q):
         """題幹出現在哪一份答案卡 PDF 上？找不到就回 None。"""
         stem = re.sub(r'\s+', '', (q.get('stem') or q.get('question') or ''))[:14]
         if len(stem) < 8:
             return None
-        for u, t in KEY_PAGES.items():
-            if stem in re.sub(r'\s+', '', t):
+        for u, t in FLAT.items():
+            if stem in t:
                 return u
         return None
 
-    idx_all = {qid(q): q for q in ALL}
-    cache, rows = dict(KEY_PAGES), []
-    for q in ALL:
+    # 三個題庫接著走一趟：id 索引（--write 要用）在同一趟裡順便建好，不必先拼一份新 list、再多走一遍
+    idx_all, cache, rows = {}, dict(KEY_PAGES), []
+    for q in chain(ds['gist_items'], ds['our_unique_items'], pool['items']):
+        i = qid(q)
+        idx_all[i] = q
         u = find_pdf(q)
         if not u:
             continue
-        if u not in cache:
-            cache[u] = fetch(u)[0]
-        r = {'id': qid(q), 'url': u, 'answer': q.get('answer')}
-        if not cache[u]:
+        page = cache.get(u)          # 查一次就好：不用先 `in` 再取、後面再取兩次
+        if page is None:
+            page = cache[u] = fetch(u)[0]
+        r = {'id': i, 'url': u, 'answer': q.get('answer')}
+        if not page:
             rows.append({**r, 'verdict': 'FETCH_FAIL'})
             continue
         if not q.get('answer'):
@@ -231,7 +263,7 @@ def main():
             rows.append({**r, 'verdict': 'ANSWER_NULL'})
             continue
         ev = (node(q).get('evidence') or [None])[0]
-        blks = blocks_of(cache[u], q.get('stem') or q.get('question'),
+        blks = blocks_of(page, q.get('stem') or q.get('question'),
                          (ev or {}).get('quote'))
         if not blks:
             rows.append({**r, 'verdict': 'NOT_FOUND'})
@@ -244,14 +276,16 @@ def main():
                 return -1.0
             return sum(max((sim(t, o['text']) for t in src.values()), default=0.0)
                        for o in _q['options']) / len(_q['options'])
-        blk = max(blks, key=fit) if len(blks) > 1 else blks[0]
+        # 每個區塊的吻合度**只算一次**：fit() 是「來源選項 × 題庫選項」兩兩跑 difflib，
+        # 原本挑區塊算一次、門檻判斷再算一次、寫進結果又算一次 —— 同一個數字算三遍。
+        blk, blk_fit = max(((b, fit(b)) for b in blks), key=lambda x: x[1])
 
         # **「來源是答案卡 PDF」不等於「這筆引文是範例題」。**
         #   同一份 PDF 裡也有大量實質內文，而有些題目引的正是那些內文。
         #   我原本沒擋這件事，於是工具會拿**隔壁題**的答案卡去對這一題的選項 ——
         #   gist[339] 被切到「從化石燃料轉向再生能源的過程」（那是別題的答案）。
         #   **那會憑空製造出錯答案。** 區塊的選項對不上題庫的選項，就不適用這個比對。
-        if fit(blk) < 0.35:
+        if blk_fit < 0.35:
             rows.append({**r, 'verdict': 'NOT_SAMPLE_Q', 'how': '這筆引文不是範例題，交叉比對不適用'})
             continue
 
@@ -285,7 +319,7 @@ def main():
 
         bk = m_s2b.get(lead)
         r |= {'how': how, 'key_text': (src.get(lead) or '').strip()[:46], 'best': bk,
-              'score': round(scores.get(lead, 0), 2), 'fit': round(fit(blk), 2)}
+              'score': round(scores.get(lead, 0), 2), 'fit': round(blk_fit, 2)}
         ov = OVERRIDE.get(r['id'])
         if not bk:
             rows.append({**r, 'verdict': 'AMBIGUOUS'})
@@ -307,53 +341,67 @@ def main():
     # （跟釘法條 sha256 是同一個模式：線上驗一次，離線守一輩子。）
     if '--write' in sys.argv:
         n = 0
+        # 重跑一次已經寫過的結果，每一筆章都會跟資料裡的一模一樣 —— 那就沒有理由把兩份檔案
+        # （兩 MB 多）重新編碼、寫一遍。只有真的有一筆不同時才寫。
+        dirty = False
+        # 每一筆章都一樣的欄位先建好；鍵的順序（date、verdict 在前）跟原本逐欄寫的一致 —— 題庫是 byte-exact 的
+        stamp = {'date': TODAY, 'verdict': 'agrees_with_official_key'}
         for x in rows:
             if x['verdict'] != 'AGREE':
                 continue
             q = idx_all[x['id']]
             nd = q.setdefault('metadata', {}) if 'provenance' not in q else q['provenance']
-            nd['answer_key_check'] = {
-                'date': TODAY, 'verdict': 'agrees_with_official_key',
+            akc = {
+                **stamp,
                 'answer': x['answer'], 'source': x['url'],
                 'key_text': (x['key_text'] or '').splitlines()[0][:60], 'how': x['how'],
             }
+            if nd.get('answer_key_check') != akc:
+                nd['answer_key_check'] = akc
+                dirty = True
             n += 1
-        ds['meta']['answer_key_check'] = {
+        meta_akc = {
             'date': TODAY, 'population': len(rows), 'confirmed': n,
             'what': 'iPAS 公版教材的範例題 PDF **直接印答案卡**。把題庫的答案拿去跟官方答案卡'
                     '逐題交叉比對 —— 這是本專案第一個能機械驗證「答案」（而非「引用」）的檢查。',
             'note': '**按文字比對，不按字母**：題庫把選項順序打散、文字也改寫過，'
                     '照字母抄會抄出錯答案。confirmed 以外的題目**不是「沒問題」，是「沒驗到」**。',
         }
-        json.dump(ds, open('quiz-app/src/data/integrated_dataset.json', 'w', encoding='utf-8'),
-                  ensure_ascii=False, indent=2)
-        json.dump(pool, open('quiz-app/src/data/practice_pool.json', 'w', encoding='utf-8'),
-                  ensure_ascii=False, indent=2)
-        print(f'\n  已把 {n} 題的 answer_key_check 寫回資料（離線 gate 用）')
-
-    import collections
-    c = collections.Counter(x['verdict'] for x in rows)
+        if ds['meta'].get('answer_key_check') != meta_akc:
+            ds['meta']['answer_key_check'] = meta_akc
+            dirty = True
+        if dirty:
+            # 兩份檔互不相干，一起寫：一份在編碼時，另一份的 write 可以同時落盤。
+            with ThreadPoolExecutor(max_workers=2) as ex:
+                list(ex.map(dump_json, (ds, pool), ('quiz-app/src/data/integrated_dataset.json',
+                                                    'quiz-app/src/data/practice_pool.json')))
+            print(f'\n  已把 {n} 題的 answer_key_check 寫回資料（離線 gate 用）')
+        else:
+            print(f'\n  {n} 題的 answer_key_check 都已在資料裡、一字不差 —— 沒有變動，不寫檔')
+
+    # 一趟把 rows 依 verdict 分桶：計數就是桶的長度，底下兩段明細直接走自己的桶，
+    # 不必為了「計數」「MISMATCH」「DOCUMENTED_OVERRIDE」把 rows 掃三遍。
+    by = {}
+    for x in rows:
+        by.setdefault(x['verdict'], []).append(x)
     print('=' * 70)
     print(f'  母體（引文來自答案卡 PDF）: {len(rows)} 題')
     for k in ('AGREE', 'MISMATCH', 'DOCUMENTED_OVERRIDE', 'AMBIGUOUS', 'NO_KEY',
               'NOT_SAMPLE_Q', 'ANSWER_NULL', 'NOT_FOUND', 'FETCH_FAIL'):
-        if c[k]:
-            print(f'    {k:11} {c[k]:4}')
+        if by.get(k):
+            print(f'    {k:11} {len(by[k]):4}')
     print('=' * 70)
-    for x in rows:
-        if x['verdict'] == 'MISMATCH':
-            print(f"  {x['id']:22} 答案卡→{x['best']} 題庫→{x['answer']}  "
-                  f"(配對相似度 {x['score']}, 題目吻合度 {x['fit']}) {x['how']}")
-            print(f"       答案卡原文：{(x['key_text'] or '').splitlines()[0][:46]}")
-    for x in rows:
-        if x['verdict'] == 'DOCUMENTED_OVERRIDE':
-            print(f"  {x['id']:22} 答案卡→{x['best']} 題庫→{x['answer']}  "
-                  f"**有記錄的刻意偏離**（restoration-manifest 的 answer_override）")
-            print(f"       理由：{x['why']}")
+    for x in by.get('MISMATCH', ()):
+        print(f"  {x['id']:22} 答案卡→{x['best']} 題庫→{x['answer']}  "
+              f"(配對相似度 {x['score']}, 題目吻合度 {x['fit']}) {x['how']}")
+        print(f"       答案卡原文：{(x['key_text'] or '').splitlines()[0][:46]}")
+    for x in by.get('DOCUMENTED_OVERRIDE', ()):
+        print(f"  {x['id']:22} 答案卡→{x['best']} 題庫→{x['answer']}  "
+              f"**有記錄的刻意偏離**（restoration-manifest 的 answer_override）")
+        print(f"       理由：{x['why']}")
     print()
     print('  AGREE 以外的**每一種**都不是「答案沒問題」，是「我沒驗到」。')
-    json.dump(rows, open('scratchpad_answer_key.json', 'w', encoding='utf-8'),
-              ensure_ascii=False, indent=1)
+    dump_json(rows, 'scratchpad_answer_key.json', pretty=False)   # 暫存給程式讀，不必縮排
 
 
 if __name__ == '__main__':
@@ -14,41 +14,33 @@
 #
 # 用法：python tools/build_evidence_manifest.py
 
-import json
+import collections
 import re
 import io
 import sys
+from itertools import chain
 
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-
-src = open('quiz-app/src/utils/source-authority.ts', encoding='utf-8').read()
-
-
-def hosts(tag):
-    # 一律從 source-authority.ts 讀，別手抄 —— 手抄過一次就漏了一個網域。
-    block = src.split(f'export const {tag}')[1].split('];')[0]
-    return tuple(re.findall(r"host:\s*'([^']+)'", block))
-
-
-PRIMARY = hosts('PRIMARY')
-SECONDARY = hosts('SECONDARY')
+from fetch_text import host_in, host_of, load_hosts
+from json_io import dump_json, load_json
 
+sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
-def host_of(u):
-    return re.sub(r'^https?://', '', u or '').split('/')[0].lower()
+# 一律從 source-authority.ts 讀，別手抄 —— 手抄過一次就漏了一個網域。（解析在 fetch_text，只有一份）
+PRIMARY = load_hosts('PRIMARY')
+SECONDARY = load_hosts('SECONDARY')
 
 
 def authority(u):
     h = host_of(u)
-    if any(h == p or h.endswith('.' + p) for p in PRIMARY):
+    if host_in(h, PRIMARY):
         return 'primary'
-    if any(h == s or h.endswith('.' + s) for s in SECONDARY):
+    if host_in(h, SECONDARY):
         return 'secondary'
     return 'unknown'
 
 
-ds = json.load(open('quiz-app/src/data/integrated_dataset.json', encoding='utf-8'))
-pool = json.load(open('quiz-app/src/data/practice_pool.json', encoding='utf-8'))
+DS_PATH = 'quiz-app/src/data/integrated_dataset.json'
+POOL_PATH = 'quiz-app/src/data/practice_pool.json'
 
 
 def qid(q):
@@ -61,8 +53,19 @@ entries = []
 
 
 def collect(items, bank, getev):
+    """走訪一次：把每一筆 evidence 記進 entries，同時回傳**題數**層級的 tier ① 計數。
+
+    兩件事在同一趟做完，題目只走一遍。
+    """
+    t1 = 0
     for q in items:
-        for e in (getev(q) or []):
+        evs = getev(q) or []
+        if any(
+            isinstance(e, dict) and authority(e.get('url', '')) == 'primary' and (e.get('quote') or '').strip()
+            for e in evs
+        ):
+            t1 += 1
+        for e in evs:
             if not isinstance(e, dict):
                 continue
             u = e.get('url')
@@ -74,35 +77,28 @@ def collect(items, bank, getev):
                 'qid': qid(q),
                 'bank': bank,
                 'url': u,
-                'host': host_of(u),
+                # 九百多筆 evidence 只有幾十個網域 —— 同一個網域字串共用一份，不要每筆各切一份
+                'host': sys.intern(host_of(u)),
                 'authority': a,
                 'has_quote': has_q,
                 'tier1': a == 'primary' and has_q,
             })
+    return t1
 
 
-collect(ds['gist_items'] + ds['our_unique_items'], 'main',
-        lambda q: (q.get('metadata') or {}).get('evidence'))
-collect(pool['items'], 'pool',
-        lambda q: (q.get('provenance') or {}).get('evidence'))
+# 整份載入，**不用** ijson 逐題串流：量過（兩份題庫，10 次平均）load_json 約 10 ms、峰值 6.8 MB，
+# ijson 逐題串流約 39 ms、峰值 0.3 MB —— 為了省 6.5 MB 慢上將近四倍，在這個大小不划算。
+# （ijson 每個事件都要回到 Python；orjson 一次在 C 裡解完。gen_gap_reports 也是同樣結論。）
+ds = load_json(DS_PATH)
+main_t1 = collect(chain(ds['gist_items'], ds['our_unique_items']), 'main',
+                  lambda q: (q.get('metadata') or {}).get('evidence'))
+pool_t1 = collect(load_json(POOL_PATH)['items'], 'pool',
+                  lambda q: (q.get('provenance') or {}).get('evidence'))
 # 穩定排序（沒有時間戳、沒有隨機）—— 同樣的資料永遠產生同一份檔案。
 entries.sort(key=lambda e: (e['bank'], e['qid'], e['url']))
 
-
-def tier1_questions(items, getev):
-    return sum(
-        1 for q in items
-        if any(
-            isinstance(e, dict) and authority(e.get('url', '')) == 'primary' and (e.get('quote') or '').strip()
-            for e in (getev(q) or [])
-        )
-    )
-
-
-main_t1 = tier1_questions(ds['gist_items'] + ds['our_unique_items'],
-                          lambda q: (q.get('metadata') or {}).get('evidence'))
-pool_t1 = tier1_questions(pool['items'],
-                          lambda q: (q.get('provenance') or {}).get('evidence'))
+# 三種等級一趟數完（原本是三個 sum()，各自把 entries 從頭走一遍）
+by_authority = collections.Counter(e['authority'] for e in entries)
 
 manifest = {
     '_meta': {
@@ -118,15 +114,14 @@ manifest = {
         'main_tier1_questions': main_t1,
         'pool_tier1_questions': pool_t1,
         'total_evidence_urls': len(entries),
-        'primary_evidence_urls': sum(1 for e in entries if e['authority'] == 'primary'),
-        'secondary_evidence_urls': sum(1 for e in entries if e['authority'] == 'secondary'),
-        'unknown_evidence_urls': sum(1 for e in entries if e['authority'] == 'unknown'),
+        'primary_evidence_urls': by_authority['primary'],
+        'secondary_evidence_urls': by_authority['secondary'],
+        'unknown_evidence_urls': by_authority['unknown'],
     },
     'entries': entries,
 }
 
-out = json.dumps(manifest, ensure_ascii=False, indent=2) + '\n'
-open('evidence-manifest.json', 'w', encoding='utf-8').write(out)
+dump_json(manifest, 'evidence-manifest.json', newline=True)
 s = manifest['summary']
 print(
     f"evidence-manifest.json: main_tier1={s['main_tier1_questions']} pool_tier1={s['pool_tier1_questions']} "
@@ -10,12 +10,37 @@
 import html
 import re
 import ssl
+import threading
 import unicodedata
 import urllib.request
+from functools import lru_cache
+from pathlib import Path
 
 _UA = 'Mozilla/5.0 (compatible; ipas-quiz-quote-verifier/1.0)'
 
 
+class _StripTable(dict):
+    """norm() 的刪字表：**第一次**遇到某個字元才查它的 Unicode 類別，之後記住答案。
+
+    norm() 一頁 PDF 就要跑幾萬個字元，而原本是逐字在 Python 層呼叫
+    unicodedata.category() —— 同一個「的」查了幾千次。
+    交給 str.translate 之後，迴圈在 C 裡跑；只有沒看過的字元才會回到這裡。
+    判準跟下面的 docstring 一字不差，只是換了一個地方執行。
+    """
+
+    def __missing__(self, cp):
+        c = chr(cp)
+        cat = unicodedata.category(c)
+        drop = (cat[0] in ('P', 'Z') or c.isspace()
+                or cat in ('So', 'Co')           # 其他符號、私用區 —— 剝
+                or 0x25A0 <= cp <= 0x25FF)       # 幾何圖形區（含被歸成 Sm 的 ◼）—— 剝
+        self[cp] = None if drop else cp          # × ÷ = − + 留著
+        return self[cp]
+
+
+_STRIP = _StripTable()
+
+
 def norm(t):
     """比對用的正規化：NFKC + 去掉標點、空白、項目符號、私用區字元。
 
@@ -44,18 +69,27 @@ def norm(t):
 
     （去重用的正規化是另一回事 —— 那邊連 So 都不能剝。判準要跟著用途走。）
     """
-    t = unicodedata.normalize('NFKC', t or '')
-    out = []
-    for c in t:
-        cat = unicodedata.category(c)
-        if cat[0] in ('P', 'Z') or c.isspace():
-            continue
-        if cat in ('So', 'Co'):          # 其他符號、私用區 —— 剝
-            continue
-        if 0x25A0 <= ord(c) <= 0x25FF:   # 幾何圖形區（含被歸成 Sm 的 ◼）—— 剝
-            continue
-        out.append(c)                    # × ÷ = − + 留著
-    return ''.join(out)
+    return unicodedata.normalize('NFKC', t or '').translate(_STRIP)
+
+
+# 同一頁常被好幾題引用（一部法規、一份公版教材），而每驗一筆引文都要把**整頁全文**正規化一次 ——
+# 幾十萬字的 NFKC＋剝符號，結果每次都一樣。以頁面文字為鍵記住它：
+# 頁面字串來自呼叫端的抓取快取、是同一個物件，它的 hash 只算一次，命中時的比較是看身分、不逐字比。
+@lru_cache(maxsize=64)
+def norm_page(t):
+    """norm() 的快取版，給「整頁全文」用。引文之類的短字串直接叫 norm()。"""
+    return norm(t)
+
+
+# 每次都是同一組設定，建一次就好：create_default_context() 每呼叫一次就重新載入整包系統 CA 憑證
+# （實測約 20 ms），而一輪驗證要抓上百個 URL。SSLContext 可以跨執行緒共用（呼叫端會平行抓）。
+# 不在 import 時建：只借 norm()／host_in() 的工具根本不連網，不該替它付這 20 ms。
+@lru_cache(maxsize=None)
+def _ssl_ctx():
+    ctx = ssl.create_default_context()
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE   # 學術網站憑證鏈常不完整；抓不到頁面 != 捏造
+    return ctx
 
 
 def _get(url, timeout=60):
@@ -76,10 +110,7 @@ def _get(url, timeout=60):
         'User-Agent': _UA,
         'Accept-Encoding': 'gzip, deflate',
     })
-    ctx = ssl.create_default_context()
-    ctx.check_hostname = False
-    ctx.verify_mode = ssl.CERT_NONE   # 學術網站憑證鏈常不完整；抓不到頁面 != 捏造
-    with urllib.request.urlopen(req, timeout=timeout, context=ctx) as r:
+    with urllib.request.urlopen(req, timeout=timeout, context=_ssl_ctx()) as r:
         raw = r.read()
         enc = (r.headers.get('Content-Encoding') or '').lower()
         if 'gzip' in enc or raw[:2] == b'\x1f\x8b':      # 也認 magic bytes：標頭會說謊
@@ -108,6 +139,11 @@ def _readable(t):
     return bad / max(len(t), 1) < 0.02
 
 
+# PyMuPDF **不是執行緒安全的**。呼叫端可以平行抓（網路等待可以重疊），
+# 但解析 PDF 那一步一次只能有一個 —— 否則不是當掉，就是默默回一份殘缺的文字。
+_FITZ_LOCK = threading.Lock()
+
+
 def _to_text(raw, ctype):
     """bytes -> 純文字。**PDF 只認 magic bytes，不認副檔名。**
 
@@ -122,8 +158,9 @@ def _to_text(raw, ctype):
     """
     if raw[:5] == b'%PDF-':
         import fitz
-        doc = fitz.open(stream=raw, filetype='pdf')
-        return chr(10).join(p.get_text() for p in doc)
+        with _FITZ_LOCK:
+            doc = fitz.open(stream=raw, filetype='pdf')
+            return chr(10).join(p.get_text() for p in doc)
 
     txt = raw.decode('utf-8', errors='replace')
     txt = re.sub(r'<script[\s\S]*?</script>|<style[\s\S]*?</style>', ' ', txt, flags=re.I)
@@ -193,7 +230,7 @@ def quote_status(quote, page_text):
 
     回傳 'verbatim' | 'reordered' | 'absent'
     """
-    pn, qn = norm(page_text), norm(quote)
+    pn, qn = norm_page(page_text), norm(quote)
     if not qn:
         return 'absent'
     if qn in pn:
@@ -226,18 +263,52 @@ def _splice_runs(qn, pn):
     return runs
 
 
+@lru_cache(maxsize=None)
+def load_hosts(tag, path='quiz-app/src/utils/source-authority.ts'):
+    """source-authority.ts 裡 `export const <tag>` 那張網域表（PRIMARY／SECONDARY）。
+
+    **這是唯一一份解析。** 原本 gen_gap_reports、sync_derived_counts、build_evidence_manifest
+    各自抄了一次「split 出區塊、findall host」—— 三份一模一樣的程式碼，
+    改一份（例如 .ts 換了寫法）另外兩份就靜靜地算出別的清單。**兩份清單一定會漂。**
+
+    一次執行裡每張表只讀、只解析一次；回傳 frozenset，快取起來不怕被誰改掉。
+    """
+    src = Path(path).read_text(encoding='utf-8')
+    block = src.split(f'export const {tag}')[1].split('];')[0]
+    return frozenset(re.findall(r"host:\s*'([^']+)'", block))
+
+
 def load_primary(path='quiz-app/src/utils/source-authority.ts'):
     """一手來源清單 —— **從 source-authority.ts 讀，不要手抄。**
 
     我手抄過一次，漏了 re100.org.tw；還有一次把 ipas.org.tw（考試的主辦單位！）
     判成「不是一手來源」。**兩份清單一定會漂。**
     """
-    src = open(path, encoding='utf-8').read()
-    block = src.split('export const PRIMARY')[1].split('];')[0]
-    return tuple(re.findall(r"host:\s*'([^']+)'", block))
+    return load_hosts('PRIMARY', path)
+
+
+def host_of(url):
+    """URL 的網域（小寫）。沒有 scheme 的字串就取第一段。"""
+    return re.sub(r'^https?://', '', url or '').split('/')[0].lower()
+
+
+def host_in(h, hosts):
+    """h 是不是 hosts 裡某個網域、或它的子網域。
+
+    原本是 `any(h == p or h.endswith('.' + p) for p in hosts)` —— 每查一次就把整份清單
+    掃一遍、每個網域各做一次字串比較。改成沿著 h 自己的標籤往上剝
+    （a.b.gov.tw → b.gov.tw → gov.tw → tw），每一層查一次 set：
+    次數只跟 h 有幾段有關，跟清單多長無關。**語意完全相同**：
+    `h.endswith('.' + p)` 成立，正好就是 p 等於 h 在某個 '.' 之後的那一段。
+    """
+    while True:
+        if h in hosts:
+            return True
+        i = h.find('.')
+        if i < 0:
+            return False
+        h = h[i + 1:]
 
 
 def is_primary(url, primary=None):
-    primary = primary or load_primary()
-    h = re.sub(r'^https?://', '', url or '').split('/')[0].lower()
-    return any(h == p or h.endswith('.' + p) for p in primary)
+    return host_in(host_of(url), primary or load_primary())
@@ -5,21 +5,23 @@
 #
 # 所以：**從資料生成，不要手寫。**
 
-import json
 import re
 import io
 import sys
+from itertools import chain
+from pathlib import Path
+
+from fetch_text import host_in, load_primary
+from json_io import load_json
 
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
-src = open('quiz-app/src/utils/source-authority.ts', encoding='utf-8').read()
-block = src.split('export const PRIMARY')[1].split('];')[0]
-PRIMARY = tuple(re.findall(r"host:\s*'([^']+)'", block))
+PRIMARY = load_primary()   # 從 source-authority.ts 讀；解析在 fetch_text，只有一份
 
-ds = json.load(open('quiz-app/src/data/integrated_dataset.json', encoding='utf-8'))
-pool = json.load(open('quiz-app/src/data/practice_pool.json', encoding='utf-8'))
+ds = load_json('quiz-app/src/data/integrated_dataset.json')
+pool = load_json('quiz-app/src/data/practice_pool.json')
 
-ITEMS = [('主題庫', q) for q in ds['gist_items'] + ds['our_unique_items']]
+ITEMS = [('主題庫', q) for q in chain(ds['gist_items'], ds['our_unique_items'])]
 ITEMS += [('練習池', q) for q in pool['items']]
 
 
@@ -39,11 +41,12 @@ def srcs(bank, q):
     # 統一的 URL 蒐集：metadata.sources / source.url / 逐字 evidence[].url 都算「有來源」。
     # 少了 evidence[].url，一題就可能同時被算成「有逐字引文」又「完全沒有來源」的不可能狀態。
     if bank == '主題庫':
-        out = [u for u in ((q.get('metadata') or {}).get('sources') or []) if isinstance(u, str)]
+        m = q.get('metadata') or {}   # 查一次就好：sources 跟 evidence 都從這裡拿
+        out = [u for u in (m.get('sources') or []) if isinstance(u, str)]
         s = q.get('source')
         if isinstance(s, dict) and isinstance(s.get('url'), str):
             out.append(s['url'])
-        ev = (q.get('metadata') or {}).get('evidence') or []
+        ev = m.get('evidence') or []
     else:
         out = list(q.get('sources') or [])
         ev = (q.get('provenance') or {}).get('evidence') or []
@@ -66,11 +69,7 @@ FABRICATED = {'gist[5]', 'gist[8]', 'gist[9]', 'gist[11]', 'gist[28]', 'gist[169
 def is_primary(url):
     m = re.match(r'https?://([^/]+)', url)
     h = m.group(1).lower() if m else ''
-    return any(h == p or h.endswith('.' + p) for p in PRIMARY)
-
-
-def has_primary(b, q):
-    return any(is_primary(u) for u in srcs(b, q))
+    return host_in(h, PRIMARY)
 
 
 def primary_evidence(b, q):
@@ -82,17 +81,22 @@ def primary_evidence(b, q):
     )
 
 
+# 三類互斥，一趟分完：每題的 URL 只蒐集一次（原本三個清單各自呼叫 srcs()，同一題算三次）。
+#
 # 「有 URL」不等於「有一手來源」：一手來源必須由事實發布者／法規/標準制定者發布。
 # 非一手 URL（部落格、新聞、二手研究）另計為第二類，不混入「一手來源」那一類。
-no_source = [(b, q) for b, q in ITEMS if not srcs(b, q)]
-# 舊版這兩類都用 `not evidence(b, q)`（有任何 evidence 就排除）——
+# 舊版後兩類都用 `not evidence(b, q)`（有任何 evidence 就排除）——
 #    於是「有一手來源 URL、但 evidence 是維基／新聞」的題會從兩類都溜掉，
 #    被默默算進「已補齊一手逐字」。改用 primary_evidence()：一手逐字才算數。
-nonprimary = [
-    (b, q) for b, q in ITEMS
-    if srcs(b, q) and not has_primary(b, q)
-]
-no_quote = [(b, q) for b, q in ITEMS if has_primary(b, q) and not primary_evidence(b, q)]
+no_source, nonprimary, no_quote = [], [], []
+for b, q in ITEMS:
+    us = srcs(b, q)
+    if not us:
+        no_source.append((b, q))
+    elif not any(is_primary(u) for u in us):
+        nonprimary.append((b, q))
+    elif not primary_evidence(b, q):
+        no_quote.append((b, q))
 
 
 def is_calc(q):
@@ -100,9 +104,14 @@ def is_calc(q):
     return bool(re.search(r'請計算|試計算|排放量為多少|為多少|=\s*\?', t)) and bool(re.search(r'\d', t))
 
 
-calc = [(b, q) for b, q in no_source if is_calc(q)]
-fab = [(b, q) for b, q in no_source if who(q) in FABRICATED and not is_calc(q)]
-rest = [(b, q) for b, q in no_source if not is_calc(q) and who(q) not in FABRICATED]
+# 1-A／1-B／1-C 三張表都按 id 排。先把 no_source 排一次，三份子清單照原順序篩出來就已經排好了
+# —— sort 是穩定的，「排好再篩」跟「篩完再各排一次」結果一模一樣。
+# 三類互斥、優先序是 計算 > 捏造 > 其他，所以一趟分派就夠 —— 每題只跑一次 is_calc 的兩個 regex，
+# 不是原本三個 comprehension 各掃一遍、同一題最多算三次。
+no_source.sort(key=lambda x: who(x[1]))
+calc, fab, rest = [], [], []
+for b, q in no_source:
+    (calc if is_calc(q) else fab if who(q) in FABRICATED else rest).append((b, q))
 
 L = []
 L.append('# 還沒有一手來源的題目')
@@ -133,7 +142,7 @@ L.append('這些題的正確性**不靠外部來源，靠算術**。CI 已有 `C
 L.append('')
 L.append('| id | 題幹 |')
 L.append('| --- | --- |')
-for b, q in sorted(calc, key=lambda x: who(x[1])):
+for b, q in calc:
     L.append(f'| `{who(q)}` | {stem(q)[:60]} |')
 L.append('')
 
@@ -147,7 +156,7 @@ L.append('捏造的引文一筆都沒有寫進題庫，所以這些題維持「
 L.append('')
 L.append('| id | 題幹 |')
 L.append('| --- | --- |')
-for b, q in sorted(fab, key=lambda x: who(x[1])):
+for b, q in fab:
     L.append(f'| `{who(q)}` | {stem(q)[:60]} |')
 L.append('')
 
@@ -158,7 +167,7 @@ L.append('多半是社群共筆自行改寫的題目，不對應任何官方教
 L.append('')
 L.append('| id | 題庫 | 題幹 |')
 L.append('| --- | --- | --- |')
-for b, q in sorted(rest, key=lambda x: who(x[1])):
+for b, q in rest:
     L.append(f'| `{who(q)}` | {b} | {stem(q)[:56]} |')
 L.append('')
 
@@ -199,6 +208,6 @@ L.append('</details>')
 out = '\n'.join(L) + '\n'
 out = re.sub(r'[ \t]+\n', '\n', out)      # 行尾空白（MD009）
 out = re.sub(r'\n{3,}', '\n\n', out)      # 連續空行（MD012）
-open('VERIFICATION-GAPS.md', 'w', encoding='utf-8').write(out)
+Path('VERIFICATION-GAPS.md').write_text(out, encoding='utf-8')   # 文字模式：換行照平台慣例，跟原本一樣
 print(f'VERIFICATION-GAPS.md：完全沒來源 {len(no_source)}（算術 {len(calc)}／引文被擋 {len(fab)}／其他 {len(rest)}）'
       f'、有來源無引文 {len(no_quote)}')
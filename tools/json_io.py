@@ -0,0 +1,109 @@
+# 題庫 JSON 的讀寫 —— **唯一一份**實作。
+#
+# 為什麼要抽出來：每支工具都各自寫了一次
+#   json.load(open(..., encoding='utf-8'))
+#   json.dump(ds, open(..., 'w', encoding='utf-8'), ensure_ascii=False, indent=2)
+# 而 integrated_dataset.json 有 2 MB 多，每支工具都要整份解析、有的還要整份寫回。
+# 標準庫的 json 編碼器在 `indent=2` 時走的是純 Python 路徑，寫一次就是整支工具最慢的一步。
+#
+# 有裝 orjson 就用它（C 寫的解析器／編碼器），沒裝就退回標準庫。
+# **兩條路徑的輸出必須逐位元組相同** —— 題庫檔是 committed 的，
+# 換一個編碼器就讓 git diff 爆出兩百萬個位元組的「變動」，那等於把真正的改動藏起來。
+#   - orjson 一律輸出 UTF-8、不跳脫非 ASCII == ensure_ascii=False
+#   - OPT_INDENT_2 的分隔符（行尾 `,`、`": "`）== indent=2
+#   - OPT_NON_STR_KEYS：標準庫會把 int 鍵默默轉成字串，orjson 預設直接拋錯 —— 對齊前者
+#
+# 用法：
+#   from json_io import load_json, dump_json
+
+import json
+import os
+import stat
+import tempfile
+
+try:
+    import orjson
+except ImportError:   # 選用相依：沒裝照樣能跑，只是慢
+    orjson = None
+
+# 新建檔案該有的權限要從 umask 算；umask 只能「設一個、拿回舊的」地讀，
+# 所以在 import 時（還沒有任何寫檔執行緒）讀一次就好。
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+def load_json(path):
+    """整份讀進來。orjson 吃 bytes，所以一律以二進位開檔 —— 連解碼那一步都省了。"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def dumps_json(data, newline=False, pretty=True):
+    """序列化成 bytes，格式與 `json.dumps(ensure_ascii=False, indent=2)` 逐位元組相同。
+
+    `pretty=False` 給**只有程式會讀**的暫存輸出（scratchpad）：不縮排，
+    等同 `separators=(',', ':')`。committed 的檔案一律保持 pretty —— 那是給人 review diff 的。
+    """
+    if orjson is not None:
+        opt = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+        out = orjson.dumps(data, option=opt)
+    elif pretty:
+        out = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+    else:
+        out = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return out + b'\n' if newline else out
+
+
+def dump_json(data, path, newline=False, pretty=True):
+    """寫回檔案。`newline` 要跟著**那個檔案原本的樣子**走，不要統一：
+
+    integrated_dataset.json 是 `json.dump` 寫的，結尾**沒有**換行；
+    manifest 類是 `json.dumps(...) + '\\n'` 寫的，結尾**有**換行。
+    「順手統一」就是讓每一次重跑都多一行 diff。
+
+    整份先序列化成一個 bytes、一次 write —— `json.dump(f)` 是邊編碼邊經過
+    TextIOWrapper 寫出幾千個小片段，檔案越大越吃虧。
+    """
+    write_atomic(path, dumps_json(data, newline=newline, pretty=pretty))
+
+
+def write_atomic(path, raw):
+    """先寫到旁邊的暫存檔、落盤，再一次 `os.replace` 換上去。
+
+    直接 `open(path, 'wb')` 會**先把原檔截成 0 位元組**，然後才開始寫 ——
+    中途被 Ctrl-C、磁碟滿、或任何例外打斷，留下的就是一份空的或半截的題庫，
+    而這個 repo 沒有「寫之前先備份」這一步：能救它的只剩 git。
+    `os.replace` 在同一個檔案系統上是原子的：讀到的要嘛是整份舊檔，要嘛是整份新檔。
+
+    暫存檔用 tempfile 取**不重複**的名字（`.<檔名>.xxxx.tmp`）：兩個執行緒同時寫
+    不會互搶同一個暫存檔。被 SIGKILL 或斷電時例外處理根本跑不到，暫存檔會留下來 ——
+    所以 .gitignore 有 `.*.tmp`，它不會被誤 commit 進題庫旁邊。
+
+    `os.replace` 換上去的是**暫存檔的 inode**，權限也是它的（tempfile 一律 0600）。
+    所以換之前先把權限設成原檔的；原本沒有這個檔，就照一般 `open()` 新建時的 umask 規則。
+    """
+    path = os.fspath(path)
+    folder, name = os.path.split(path)
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+    f = tempfile.NamedTemporaryFile('wb', dir=folder or '.', prefix=f'.{name}.', suffix='.tmp',
+                                    delete=False)
+    tmp = f.name
+    try:
+        with f:   # Windows 上開著的檔案不能被 replace —— 先關再換
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
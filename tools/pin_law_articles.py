@@ -41,12 +41,14 @@ from __future__ import annotations
 import argparse
 import hashlib
 import html
-import json
 import re
 import sys
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from json_io import dump_json, load_json
+
 # Windows 繁中預設 cp950，直接 print 中文會 UnicodeEncodeError。
 if hasattr(sys.stdout, 'reconfigure'):
     sys.stdout.reconfigure(encoding='utf-8', errors='replace')
@@ -102,8 +104,12 @@ def parse_articles(raw: str) -> dict[str, str]:
 
 def build() -> dict:
     laws = {}
-    for pcode, expected_name in LAWS.items():
-        raw = fetch(pcode)
+    # 六部法規互不相干，一起抓：整支的時間從「六次往返相加」變成「最慢的那一次」。
+    # map 保持 LAWS 的順序，所以底下的檢查、輸出與釘選檔的鍵順序都跟逐一抓時一樣；
+    # 任何一部抓失敗，例外照樣在這裡拋出來。
+    with ThreadPoolExecutor(max_workers=len(LAWS)) as ex:
+        pages = list(ex.map(fetch, LAWS))
+    for (pcode, expected_name), raw in zip(LAWS.items(), pages):
         title = re.search(r'<title>(.*?)</title>', raw, re.S)
         name = html.unescape(title.group(1)).replace('-全國法規資料庫', '').strip() if title else ''
         if name != expected_name:
@@ -146,16 +152,14 @@ def main() -> int:
     fresh = build()
 
     if not args.check:
-        PINNED.write_text(
-            json.dumps(fresh, ensure_ascii=False, indent=2) + '\n', encoding='utf-8'
-        )
+        dump_json(fresh, PINNED, newline=True)
         print(f'\n已寫入 {PINNED.relative_to(ROOT)}')
         return 0
 
     if not PINNED.exists():
         print(f'\n釘選檔不存在：{PINNED}', file=sys.stderr)
         return 1
-    old = json.loads(PINNED.read_text(encoding='utf-8'))
+    old = load_json(PINNED)
     drift = [
         f'  {p}  {LAWS[p]}\n'
         f'      釘選 sha256 {old["laws"].get(p, {}).get("sha256", "(缺)")[:16]}… '
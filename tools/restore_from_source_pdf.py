@@ -41,12 +41,19 @@ from __future__ import annotations
 
 import argparse
 import hashlib
-import json
 import re
 import sys
 import urllib.request
 from pathlib import Path
 
+from json_io import dump_json, load_json
+
+try:
+    from rapidfuzz import process
+    from rapidfuzz.distance import Indel
+except ImportError:   # 選用相依：沒裝就逐題比，結果一樣（見 _closest）
+    process = Indel = None
+
 # 繁體中文 Windows 的預設 codepage 是 cp950 —— 而那正是這個專案的主要讀者。
 # 這支腳本印 ✓ / / 中文，在 cp950 下會直接 UnicodeEncodeError，**一題都還沒驗就死**。
 # DATA-PROVENANCE.md 的整篇論點是「每個宣稱都對應一個任何人都能自己跑一遍的檢查」——
@@ -84,6 +91,13 @@ Q_RE = re.compile(r'^\(([A-D])\)\s*(\d{1,3})\s*[.、]\s*(.*)$')
 OPT_RE = re.compile(r'^\(([A-D])\)\s*(.*)$')
 SEP_RE = re.compile(r'^-{5,}$')
 
+# 指紋與比對的正規化每題都要跑好幾次（擷取、對帳、找最像的主庫題），一次編譯好。
+# **選項文字只剝 ASCII 空白、題幹剝全部 \s** —— 兩條規則不一樣是刻意的，
+# 必須與 restoration-manifest.test.ts 的 hash 逐字一致，不要「統一」。
+STEM_WS_RE = re.compile(r'\s+')
+OPT_WS_RE = re.compile(r'[ \t\r\n]+')
+CMP_STRIP_RE = re.compile(r'[\s，,。.；;、：:（）()「」【】]')
+
 
 def sha256_bytes(b: bytes) -> str:
     return hashlib.sha256(b).hexdigest()
@@ -91,8 +105,8 @@ def sha256_bytes(b: bytes) -> str:
 
 def normalized_text_sha256(stem: str, options: list[dict]) -> str:
     """題目內容的正規化指紋。空白全部剝掉，選項依 key 排序 —— 只認內容，不認排版。"""
-    payload = re.sub(r'\s+', '', stem) + '||' + '|'.join(
-        f"{o['key']}:{re.sub(r'[ \t\r\n]+', '', o['text'])}"
+    payload = STEM_WS_RE.sub('', stem) + '||' + '|'.join(
+        f"{o['key']}:{OPT_WS_RE.sub('', o['text'])}"
         for o in sorted(options, key=lambda x: x['key'])
     )
     return sha256_bytes(payload.encode('utf-8'))
@@ -213,8 +227,8 @@ def patch_pdf_typos(qs, src_id):
     """來源 PDF 自己的錯字。逐筆註明，不做無憑據的猜測。"""
     patched = []
     if src_id == 'S_CHU_06':
-        q37 = next((q for q in qs if q['number'] == 37), None)
-        q86 = next((q for q in qs if q['number'] == 86), None)
+        by_no = {q['number']: q for q in qs}   # 建一次索引，不必為每個題號各把 qs 掃一遍
+        q37, q86 = by_no.get(37), by_no.get(86)
         if q37 and [o['key'] for o in q37['options']] == ['A', 'B', 'B', 'C']:
             # PDF 原文把選項標成 (A)(B)(B)(C)。同一份 PDF 的第 86 題是同一道題目、
             # 選項文字完全相同且標號正確 —— 所以這個修正是有憑據的，不是猜的。
@@ -247,7 +261,7 @@ def load_pdf(src_id: str, cache: Path) -> bytes:
 
 def _norm_for_compare(s: str) -> str:
     """比對用的正規化：剝空白、剝標點。'數據來源' 與 '數據來源；' 是同一件事。"""
-    return re.sub(r'[\s，,。.；;、：:（）()「」【】]', '', s)
+    return CMP_STRIP_RE.sub('', s)
 
 
 def _answer_text(item: dict) -> str | None:
@@ -271,6 +285,39 @@ def _similar(a: str, b: str) -> float:
     return difflib.SequenceMatcher(None, a, b).ratio()
 
 
+def _closest(qnorm: str, ds_items: list, ds_norms: list[str]) -> tuple[dict | None, float]:
+    """主庫裡題幹最像 qnorm 的那一題，與「逐題跑 difflib、取第一個最高分」**結果完全相同**。
+
+    逐題跑 difflib 是 O(主庫題數) 次純 Python 比對，每一道掉出來的來源題都要跑一輪。
+    有裝 rapidfuzz 就先用它（C 實作）一次算出每一題的 **Indel 相似度** ——
+    它是 2·LCS/總長，而 difflib 的 ratio 是 2·M/總長、M 是它貪婪找到的匹配數，
+    **M 不可能超過 LCS**。所以 Indel 分數是 difflib 分數的嚴格上界：
+    依上界由高到低逐一用 difflib 算真分數，上界一旦低於目前最佳就可以停。
+
+    **不可以直接拿 rapidfuzz 的分數取代 difflib。** 0.80 這條線是對著 difflib 定的；
+    換一個分數，同一份資料在有裝／沒裝的機器上就會判出不同的 disposition。
+
+    **`processor=None` 必須明寫。** rapidfuzz 3.0 以前 `process.extract` 預設會套
+    `utils.default_process`（轉小寫、把 `%` `/` `-` `=` 等非英數字元剝掉）——
+    那算的就不是同一對字串了，上界不再是上界，提前 break 會把真正最像的那題丟掉。
+    """
+    if process is None:
+        order = [(1.0, i) for i in range(len(ds_norms))]
+    else:
+        order = [(s, i) for _, s, i in process.extract(
+            qnorm, ds_norms, scorer=Indel.normalized_similarity, processor=None, limit=None)]
+
+    best, best_i, best_r = None, -1, 0.0
+    for bound, i in order:
+        if bound + 1e-9 < best_r:
+            break
+        r = _similar(qnorm, ds_norms[i])
+        # 同分取主庫裡**排在前面**的那一題 —— 跟逐題比對的 `r > best_r` 一致
+        if r > best_r or (r == best_r and best is not None and i < best_i):
+            best, best_i, best_r = ds_items[i], i, r
+    return best, best_r
+
+
 def _answers_agree(src_q: dict, ds_item: dict) -> tuple[bool, float]:
     """兩個來源對「同一道題」給的答案，是不是同一個選項？
 
@@ -307,7 +354,8 @@ def _answers_agree(src_q: dict, ds_item: dict) -> tuple[bool, float]:
     return best_key == ds_ans_key, round(best_r, 3)
 
 
-def _disposition_for_dropped(q: dict, src_id: str, same_pdf: dict, ds_items: list) -> dict:
+def _disposition_for_dropped(q: dict, src_id: str, same_pdf: dict[str, list[int]],
+                             ds_items: list, ds_norms: list[str]) -> dict:
     """一道「沒有進 dataset」的來源題，到底發生了什麼事？必須拿出證據，不能用猜的。
 
     舊版是這樣寫的：
@@ -324,7 +372,7 @@ def _disposition_for_dropped(q: dict, src_id: str, same_pdf: dict, ds_items: lis
     qnorm = _norm_for_compare(q['stem'])
 
     # 1) 同一份 PDF 裡有一模一樣的題目（PDF 自己重印）
-    twin = [n for n, h in same_pdf.items() if h == qhash and n < q['number']]
+    twin = [n for n in same_pdf.get(qhash, ()) if n < q['number']]
     if twin:
         return {
             'status': 'duplicate_within_source',
@@ -334,11 +382,7 @@ def _disposition_for_dropped(q: dict, src_id: str, same_pdf: dict, ds_items: lis
         }
 
     # 2) 主庫裡已經有內容相同／幾乎相同的題目
-    best, best_r = None, 0.0
-    for it in ds_items:
-        r = _similar(qnorm, _norm_for_compare(it['stem']))
-        if r > best_r:
-            best, best_r = it, r
+    best, best_r = _closest(qnorm, ds_items, ds_norms)
 
     if best is not None and best_r >= 0.80:
         src_ans = _answer_text(q)
@@ -380,9 +424,10 @@ def _disposition_for_dropped(q: dict, src_id: str, same_pdf: dict, ds_items: lis
 
 
 def build(cache: Path):
-    ds = json.loads(DATASET.read_text(encoding='utf-8'))
+    ds = load_json(DATASET)
     by_item = {i['item_id']: i for i in ds['our_unique_items']}
     ds_items = ds['gist_items'] + ds['our_unique_items']
+    ds_norms = [_norm_for_compare(it['stem']) for it in ds_items]   # 每題只正規化一次
 
     entries, pdf_typos, dispositions = [], {}, []
     for src_id in SOURCES:
@@ -402,8 +447,14 @@ def build(cache: Path):
         pdf_typos[src_id] = patch_pdf_typos(qs, src_id)
         fixes_by_no = {t['question_no']: t for t in pdf_typos[src_id]}
 
-        # 同一份 PDF 內每題的內容指紋 —— 用來認出「PDF 自己重印的題目」
-        same_pdf = {q['number']: normalized_text_sha256(q['stem'], q['options']) for q in qs}
+        # 同一份 PDF 內每題的內容指紋 —— 用來認出「PDF 自己重印的題目」。
+        # 以指紋為鍵、題號清單為值：**同一個指紋本來就會出現不只一次**（那正是要找的重印題），
+        # 用 {指紋: 題號} 會讓後一題默默蓋掉前一題。
+        # 修正後的指紋每題只算一次：底下的 canonical_source_text_sha256 就是同一個值，直接查表。
+        canon_hash = {q['number']: normalized_text_sha256(q['stem'], q['options']) for q in qs}
+        same_pdf: dict[str, list[int]] = {}
+        for n, h in canon_hash.items():
+            same_pdf.setdefault(h, []).append(n)
 
         expected = EXPECTED_QUESTION_COUNT[src_id]
         got_numbers = sorted(q['number'] for q in qs)
@@ -414,13 +465,13 @@ def build(cache: Path):
 
         for q in qs:
             item_id = f'{src_id}-q{q["number"]:03d}'
-            if item_id not in by_item:
-                d = _disposition_for_dropped(q, src_id, same_pdf, ds_items)
+            it = by_item.get(item_id)   # 從來源這一側（幾十題）去查題庫的索引，一題查一次
+            if it is None:
+                d = _disposition_for_dropped(q, src_id, same_pdf, ds_items, ds_norms)
                 d.update({'source_id': src_id, 'source_question_number': q['number'],
                           'page': q['page'], 'column': q['column']})
                 dispositions.append(d)
                 continue
-            it = by_item[item_id]
             dispositions.append({
                 'source_id': src_id,
                 'source_question_number': q['number'],
@@ -443,7 +494,7 @@ def build(cache: Path):
             #
             # transformations 逐筆列出「動了什麼、憑什麼動」。空陣列＝原文照抄。
             raw_h = raw_hash[q['number']]
-            canon_h = normalized_text_sha256(q['stem'], q['options'])
+            canon_h = canon_hash[q['number']]
             ds_hash = normalized_text_sha256(it['stem'], it['options'])
             fix = fixes_by_no.get(q['number'])
             transformations = [{'fix': fix['fix'], 'evidence': fix['evidence']}] if fix else []
@@ -567,7 +618,7 @@ def build(cache: Path):
 def verify(cache: Path) -> int:
     if not MANIFEST.exists():
         sys.exit('✗ 找不到 manifest，請先 --emit')
-    man = json.loads(MANIFEST.read_text(encoding='utf-8'))
+    man = load_json(MANIFEST)
     fresh = build(cache)
 
     old = {e['item_id']: e for e in man['entries']}
@@ -650,8 +701,7 @@ def main() -> int:
 
     if a.emit:
         man = build(cache)
-        MANIFEST.write_text(
-            json.dumps(man, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
+        dump_json(man, MANIFEST, newline=True)
         print(f'\n已寫入 {MANIFEST.relative_to(REPO)}（{man["_meta"]["restored_count"]} 題）')
         return 0
     if a.verify:
@@ -14,10 +14,16 @@
 #   python tools/sync_derived_counts.py --check   # 只印出不一致，不寫檔（CI 用）
 #   python tools/sync_derived_counts.py           # 實際寫回
 
-import json
+import collections
 import re
 import sys
 import io
+import types
+from itertools import chain
+from pathlib import Path
+
+from fetch_text import is_primary as _is_primary, load_primary
+from json_io import dump_json, load_json
 
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
@@ -29,28 +35,27 @@ README = 'README.md'
 CURRENCY = 'CONTENT-CURRENCY.md'
 
 # PRIMARY 一律從 source-authority.ts 讀 —— 手抄過一次，漏了 re100.org.tw。
-src = open('quiz-app/src/utils/source-authority.ts', encoding='utf-8').read()
-block = src.split('export const PRIMARY')[1].split('];')[0]
-PRIMARY = tuple(re.findall(r"host:\s*'([^']+)'", block))
-
-
-def host_of(url):
-    return re.sub(r'^https?://', '', url or '').split('/')[0].lower()
+# 解析與判準都 import fetch_text 的那一份，這裡不再自己寫。
+PRIMARY = load_primary()
 
 
 def is_primary(url):
-    h = host_of(url)
-    return any(h == p or h.endswith('.' + p) for p in PRIMARY)
+    return _is_primary(url, PRIMARY)
 
 
-ds = json.load(open(DS_PATH, encoding='utf-8'))
-pool = json.load(open(POOL_PATH, encoding='utf-8'))
+ds = load_json(DS_PATH)
+pool = load_json(POOL_PATH)
 ALL = ds['gist_items'] + ds['our_unique_items']
 POOL = pool['items']
 
 
+# md() 每題要被叫十幾次，而大半的題沒有 metadata —— `or {}` 每次都新建一個空 dict。
+# 共用一個**唯讀**的空映射：誰想往 md(q) 裡寫東西就會直接炸，而不是默默寫進一個用完即丟的 dict。
+_NO_MD = types.MappingProxyType({})
+
+
 def md(q):
-    return q.get('metadata') or {}
+    return q.get('metadata') or _NO_MD
 
 
 def main_srcs(q):
@@ -100,21 +105,67 @@ def has_evidence(q, kind):
     )
 
 
+def was_corrected(q):
+    # metadata 是空的就直接短路 —— 不必替它查 prior_answer
+    m = q.get('metadata')
+    return bool(m) and bool(m.get('prior_answer')) and m['prior_answer'] != q.get('answer')
+
+
+corrected = list(filter(was_corrected, ALL))
+
+cr = ds['meta'].get('content_review', {})
+last = cr.get('last_review_date') or ''
+
+# **必須是 `>=`，不可以是 `==`。**
+#
+# 這條原本寫 `valid_as_of == last_review_date`，於是它有一個很醜的失敗模式：
+# **一題查得越新，分數越低。**
+#
+# gist[520] 在 07-13（last_review_date）複查過。07-14 我又查了一次，
+# 而且**抓出它的答案是錯的**（B→C），於是 valid_as_of 更新成 07-14。
+# 結果 `== last` 不成立 → 它從「本輪已重查」掉出去，還被歸進「積欠未查」那一堆。
+#
+# 「我今天重查並修好了它」被記成「我沒查它」。日期比較要用 `>=`。
+# （ISO 日期字串的字典序 == 時序，可以直接比。）
+def is_fresh(q):
+    return (md(q).get('valid_as_of') or '') >= last
+
+
+# 每一題只走**一次**，把所有計數一起累加。
+#
+# 原本是十來個 `sum(1 for q in ALL if ...)`，各自把 775 題從頭走一遍，
+# 而 main_srcs(q) 在「一手來源」與「無來源」兩條裡各算一次。
+# 判準本身一個字都沒改 —— 它們仍然必須跟 docs-counts.test.ts 一模一樣。
+T = collections.Counter()
+by_subject = collections.Counter()
+for q in ALL:
+    srcs = main_srcs(q)
+    ts = 'time_sensitive' in (q.get('quality_flags') or [])
+    fresh = is_fresh(q)
+    T['with_answer'] += bool(q.get('answer'))
+    T['time_sensitive'] += ts
+    T['main_quote'] += has_evidence(q, 'main')
+    T['main_primary'] += any(is_primary(u) for u in srcs)
+    T['main_nosource'] += not srcs
+    T['reverified'] += fresh
+    T['carried_over'] += ts and not fresh
+    by_subject[q.get('exam_subject')] += 1
+for q in POOL:
+    T['pool_quote'] += has_evidence(q, 'pool')
+    T['pool_primary'] += any(is_primary(u) for u in pool_srcs(q))
+
 N = {
     'total': len(ALL),
-    'with_answer': sum(1 for q in ALL if q.get('answer')),
-    'time_sensitive': sum(1 for q in ALL if 'time_sensitive' in (q.get('quality_flags') or [])),
-    'corrections': sum(
-        1 for q in ALL if md(q).get('prior_answer') and md(q)['prior_answer'] != q.get('answer')
-    ),
-    'main_quote': sum(1 for q in ALL if has_evidence(q, 'main')),
-    'main_primary': sum(1 for q in ALL if any(is_primary(u) for u in main_srcs(q))),
-    'main_nosource': sum(1 for q in ALL if not main_srcs(q)),
-    'pool_quote': sum(1 for q in POOL if has_evidence(q, 'pool')),
-    'pool_primary': sum(1 for q in POOL if any(is_primary(u) for u in pool_srcs(q))),
+    'with_answer': T['with_answer'],
+    'time_sensitive': T['time_sensitive'],
+    'corrections': len(corrected),
+    'main_quote': T['main_quote'],
+    'main_primary': T['main_primary'],
+    'main_nosource': T['main_nosource'],
+    'pool_quote': T['pool_quote'],
+    'pool_primary': T['pool_primary'],
     'pool_total': len(POOL),
 }
-corrected = [q for q in ALL if md(q).get('prior_answer') and md(q)['prior_answer'] != q.get('answer')]
 N['corr_with_url'] = sum(1 for q in corrected if main_srcs(q))
 N['corr_no_url'] = len(corrected) - N['corr_with_url']
 
@@ -130,45 +181,28 @@ def verdict(q):
     return a or b
 
 
-BOTH = ALL + POOL
-
-
 def _nd(q):
     return q.get('metadata') or q.get('provenance') or {}
 
 
-# 官方答案卡蓋章數（tools/answer_key_crosscheck.py 寫進去的）
-N['akc_confirmed'] = sum(1 for q in BOTH if _nd(q).get('answer_key_check'))
+# 官方答案卡蓋章數（tools/answer_key_crosscheck.py 寫進去的）＋各 verdict 的題數，同樣一趟算完
+akc = 0
+V = collections.Counter()
+for q in chain(ALL, POOL):   # 兩個題庫接著走，不必先拼出一份 929 題的新 list
+    akc += bool(_nd(q).get('answer_key_check'))
+    V[verdict(q)] += 1
+N['akc_confirmed'] = akc
 
-N['ca_supported'] = sum(1 for q in BOTH if verdict(q) == 'supported')
-N['ca_replaced'] = sum(1 for q in BOTH if verdict(q) == 'citation_replaced')
-N['ca_disputed'] = sum(1 for q in BOTH if verdict(q) == 'citation_disputed')
-N['ca_no_quote'] = sum(1 for q in BOTH if verdict(q) == 'no_quote')
-N['ca_dead'] = sum(1 for q in BOTH if verdict(q) == 'dead')
+N['ca_supported'] = V['supported']
+N['ca_replaced'] = V['citation_replaced']
+N['ca_disputed'] = V['citation_disputed']
+N['ca_no_quote'] = V['no_quote']
+N['ca_dead'] = V['dead']
 # gate 要求的恆等式：引錯地方的 = 已換掉的 + 仍存疑的
 N['ca_wrong'] = N['ca_replaced'] + N['ca_disputed']
 
-cr = ds['meta'].get('content_review', {})
-last = cr.get('last_review_date')
-
-# **必須是 `>=`，不可以是 `==`。**
-#
-# 這條原本寫 `valid_as_of == last_review_date`，於是它有一個很醜的失敗模式：
-# **一題查得越新，分數越低。**
-#
-# gist[520] 在 07-13（last_review_date）複查過。07-14 我又查了一次，
-# 而且**抓出它的答案是錯的**（B→C），於是 valid_as_of 更新成 07-14。
-# 結果 `== last` 不成立 → 它從「本輪已重查」掉出去，還被歸進「積欠未查」那一堆。
-#
-# 「我今天重查並修好了它」被記成「我沒查它」。日期比較要用 `>=`。
-# （ISO 日期字串的字典序 == 時序，可以直接比。）
-N['reverified'] = sum(1 for q in ALL if (md(q).get('valid_as_of') or '') >= (last or ''))
-N['carried_over'] = sum(
-    1
-    for q in ALL
-    if 'time_sensitive' in (q.get('quality_flags') or [])
-    and (md(q).get('valid_as_of') or '') < (last or '')
-)
+N['reverified'] = T['reverified']
+N['carried_over'] = T['carried_over']
 # 本輪未重查題數 = 總題數 - 已重查。原本這個欄位沒人算 —— 於是它凍在舊快照 680，
 # 而正確值是 775 - 131 = 644（多批次查證後 reverified 會變，這欄若不由公式算就必漂）。
 N['not_reviewed'] = N['total'] - N['reverified']
@@ -191,7 +225,7 @@ set_meta('content_review.total_questions', N['total'])
 set_meta('gist_questions', len(ds['gist_items']))
 set_meta('our_unique_questions', len(ds['our_unique_items']))
 # 考科分佈也由資料算 —— 原本手寫，加一題就漂。key 順序固定（考科1、考科2）以維持 byte-exact。
-set_meta('by_subject', {s: sum(1 for q in ALL if q.get('exam_subject') == s) for s in ('考科1', '考科2')})
+set_meta('by_subject', {s: by_subject[s] for s in ('考科1', '考科2')})
 set_meta('with_answer', N['with_answer'])
 set_meta('corrections_applied', N['corrections'])
 set_meta('content_review.time_sensitive_count', N['time_sensitive'])
@@ -211,7 +245,10 @@ set_meta('answer_key_check.confirmed', N['akc_confirmed'])
 #   「錨點對不上就 print 一行然後 return」的行為。死碼帶著已知的 bug，
 #   等著下一個人把它接回去用。刪掉。）
 
-docs = {README: open(README, encoding='utf-8').read(), CURRENCY: open(CURRENCY, encoding='utf-8').read()}
+# Path.read_text / write_text：開完就關（原本的 `open(...).read()` 把關檔交給 GC），
+# 而且跟 open() 一樣走文字模式 —— **不能**換成 read_bytes：Windows 上 checkout 出來是 CRLF，
+# 文字模式讀進來才是 `\n`，底下的錨點 regex 都是照 `\n` 寫的。
+docs = {p: Path(p).read_text(encoding='utf-8') for p in (README, CURRENCY)}
 
 # **這份清單漏一條，就等於在說謊。**
 #
@@ -301,7 +338,7 @@ if CHECK:
     print('\n  --check 模式：有不一致，未寫檔')
     sys.exit(1)
 
-json.dump(ds, open(DS_PATH, 'w', encoding='utf-8'), ensure_ascii=False, indent=2)
+dump_json(ds, DS_PATH)
 for path, text in docs.items():
-    open(path, 'w', encoding='utf-8').write(text)
+    Path(path).write_text(text, encoding='utf-8')
 print('\n  已寫回')
@@ -42,7 +42,8 @@
     python tools/verify_agent_quotes.py <代理輸出的 res*.json 所在目錄>
 """
 
-import json, sys, io, re, glob, collections, os
+import sys, io, re, glob, collections, os
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
@@ -58,7 +59,8 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 #   - 抓不到就走 Wayback（否則被擋的站永遠無法驗證）
 #   - NFKC（中文 PDF 用 CJK 相容字）
 #   - 引文分三類：逐字 / 重排但片段皆真 / 查無此句（不是兩類）
-from fetch_text import fetch, load_primary, norm, quote_status   # noqa: E402
+from fetch_text import fetch, host_in, host_of, load_primary, norm, norm_page, quote_status   # noqa: E402
+from json_io import dump_json, load_json   # noqa: E402
 
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
 
@@ -66,11 +68,19 @@ S = (r'C:\Users\thc1006\AppData\Local\Temp\claude'
      r'\D--dev-06-june-exam\2a55d42b-3609-4580-be5d-18f505590582\scratchpad')
 PRIMARY = load_primary()
 
+
+def fetch_or_fail(url):
+    try:
+        return fetch(url)
+    except Exception as e:
+        return (f'__FETCH_FAIL__{e}', url)
+
+
 ROUND = sys.argv[1] if len(sys.argv) > 1 else 'r3'
 results = []
 for f in sorted(glob.glob(f'{S}/{ROUND}/res*.json')):
     try:
-        results += json.load(open(f, encoding='utf-8'))
+        results += load_json(f)
     except Exception as e:
         print(f'!! 讀不到 {f}: {e}')
 
@@ -79,7 +89,16 @@ print('=' * 100)
 print('引文機械驗證：把 agent 引的那個 URL 抓下來，檢查引文是否逐字存在')
 print('=' * 100)
 
-cache = {}
+# 先把**會被比對到的**頁面一起抓回來：一輪上百題，依序抓就是把上百次網路等待（含 Wayback 重試）疊起來。
+# 篩選條件跟底下迴圈的前幾道關卡一樣；就算漏了哪個，迴圈裡還是會照舊補抓 —— 這裡只是預熱。
+# （fetch() 平行呼叫是安全的：PDF 解析那一步在 fetch_text 裡有鎖。）
+want = sorted({
+    u for r in results
+    if r.get('verdict') != 'NO_PRIMARY_SOURCE' and (r.get('quote') or '').strip()
+    and (u := (r.get('source_url') or '').strip()) and host_in(host_of(u), PRIMARY)
+})
+with ThreadPoolExecutor(max_workers=8) as ex:
+    cache = dict(zip(want, ex.map(fetch_or_fail, want)))
 tally = collections.Counter()
 rows = []
 for r in results:
@@ -98,17 +117,14 @@ for r in results:
         rows.append((qid, v, '', '宣稱有結論，卻沒有 URL 或引文'))
         continue
 
-    host = re.sub(r'^https?://', '', url).split('/')[0].lower()
-    if not any(host == p or host.endswith('.' + p) for p in PRIMARY):
+    host = host_of(url)
+    if not host_in(host, PRIMARY):
         tally['不是一手來源'] += 1
         rows.append((qid, v, '', f'{host} 不在一手來源清單裡'))
         continue
 
     if url not in cache:
-        try:
-            cache[url] = fetch(url)
-        except Exception as e:
-            cache[url] = (f'__FETCH_FAIL__{e}', url)
+        cache[url] = fetch_or_fail(url)
     page, via = cache[url]
     if page.startswith('__FETCH_FAIL__'):
         tally['抓不到頁面'] += 1
@@ -118,7 +134,7 @@ for r in results:
     # 走了存檔才讀到 —— 引文仍然算數（是同一份文件），但要說出來源是哪裡讀到的
     archived = 'web.archive.org' in via
 
-    pn = norm(page)
+    pn = norm_page(page)
     qn = norm(quote)
 
     # **「我抓不到內容」不等於「它捏造了」。**
@@ -191,4 +207,4 @@ if checked:
 print(f'  ▶ 找不到一手來源：{nos} 題（無從查證）')
 if fab:
     print(f'  **agent 捏造了 {fab} 筆引文** —— 這正是為什麼不能相信 AI 的「判定」')
-json.dump(rows, open(f'{S}/r2/quote_check.json', 'w', encoding='utf-8'), ensure_ascii=False, indent=1)
+dump_json(rows, f'{S}/r2/quote_check.json', pretty=False)
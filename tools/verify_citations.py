@@ -23,12 +23,13 @@
 import collections
 import glob
 import io
-import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from fetch_text import fetch, is_primary, load_primary, quote_status  # noqa: E402
+from json_io import load_json  # noqa: E402
 
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
@@ -37,10 +38,24 @@ S = (r'C:\Users\thc1006\AppData\Local\Temp\claude'
 ROUND = sys.argv[1] if len(sys.argv) > 1 else 'r4'
 PRIMARY = load_primary()
 
+
+def _wanted(r):
+    """這一筆會去抓的頁面 —— 條件跟底下迴圈裡實際呼叫 page() 的那幾條一樣。"""
+    v = (r.get('verdict') or '').upper()
+    if v == 'SUPPORTED':
+        u = (r.get('cited_url') or '').strip()
+        return u if u and (r.get('quote') or '').strip() else None
+    if v in ('WRONG_SOURCE', 'CONTRADICTED'):
+        u = (r.get('correct_source_url') or '').strip()
+        if u and (r.get('correct_quote') or '').strip() and is_primary(u, PRIMARY):
+            return u
+    return None
+
+
 results = []
 for f in sorted(glob.glob(f'{S}/{ROUND}/res*.json')):
     try:
-        results += json.load(open(f, encoding='utf-8'))
+        results += load_json(f)
     except Exception as e:
         print(f'!! 讀不到 {f}: {e}')
 
@@ -49,16 +64,27 @@ print('=' * 96)
 print('引用複驗：把題庫「已經引的那個 URL」抓回來，檢查它到底有沒有說這件事')
 print('=' * 96)
 
-cache = {}
+# 先把要比對的頁面一起抓回來（上百題依序抓 = 上百次網路等待疊起來）。
+# 漏抓的 page() 照樣會補抓 —— 這裡只是預熱，不改變任何判定。
+want = sorted({u for u in map(_wanted, results) if u})
+with ThreadPoolExecutor(max_workers=8) as ex:
+    cache = dict(zip(want, ex.map(fetch, want)))
+# quote_status() 只會回這三種；統計標籤查表，不必每題走一串 if/elif 再各自指定一次
+SUPPORTED_TAG = {
+    'verbatim': '引用正確（引文逐字在該頁上）',
+    'reordered': '引用正確，但引文被重新排序（片段皆真）',
+    'absent': '引文在該頁上查無此句（捏造）',
+}
 tally = collections.Counter()
 rows = []
 needs_human = []
 
 
 def page(url):
-    if url not in cache:
-        cache[url] = fetch(url)
-    return cache[url]
+    hit = cache.get(url)
+    if hit is None:
+        hit = cache[url] = fetch(url)
+    return hit
 
 
 for r in results:
@@ -78,18 +104,8 @@ for r in results:
             tally['抓不到頁面（無法判斷，≠ 捏造）'] += 1
             rows.append((qid, v, '', f'{cited[:44]}… 抓不到 —— **無法判斷**'))
             continue
-        st = quote_status(quote, txt)
-        if st == 'verbatim':
-            tag = '引用正確（引文逐字在該頁上）'
-            mark = ''
-        elif st == 'reordered':
-            tag = '引用正確，但引文被重新排序（片段皆真）'
-            mark = ''
-        else:
-            tag = '引文在該頁上查無此句（捏造）'
-            mark = ''
-        tally[tag] += 1
-        rows.append((qid, v, mark, f'{cited[:52]}'))
+        tally[SUPPORTED_TAG[quote_status(quote, txt)]] += 1
+        rows.append((qid, v, '', f'{cited[:52]}'))
         continue
 
     # ---- WRONG_SOURCE / CONTRADICTED：**不自動改資料**，只驗證正面證據